@@ -1,8 +1,12 @@
 import pandas as pd
 import os
 import re
-import glob
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np # Import numpy for np.nan
+import logging
+import hashlib
+
+logger = logging.getLogger(__name__)
 
 # --- Configuration ---
 # Set the main directory where this script is located.
@@ -12,31 +16,73 @@ BASE_DIR = os.getcwd() # Gets the current working directory where the script is
 # Define the sub-directory containing the satellite data files.
 SATELLITE_DATA_DIR = os.path.join(BASE_DIR, 'satellite data readings')
 
-# --- Output File Names (Currently set to CSV, can be changed to XLSX if preferred) ---
+# --- Output File Names (Currently set to CSV, can be changed to XLSX or Parquet if preferred) ---
 SATELLITE_AVG_OUTPUT_FILE = os.path.join(BASE_DIR, 'satellite_yearly_averages.csv')
 YEARLY_CORRECTION_FACTOR_FILE = os.path.join(BASE_DIR, 'yearly_correction_factors.csv')
 GRAND_CORRECTION_FACTOR_FILE = os.path.join(BASE_DIR, 'grand_correction_factors.csv')
 
+# Maximum number of daily rows of a station file held in memory at once
+SATELLITE_CHUNK_ROWS = 200_000
+
+# --- Cache of parsed station files (reused while a station file is unchanged) ---
+SATELLITE_CACHE_DIR = os.path.join(BASE_DIR, '.cf_station_cache')
+# Bump this whenever the content returned by _process_station_file changes
+SATELLITE_CACHE_VERSION = 2
+
 # --- Helper Function for Saving DataFrames ---
 # This helper can be extended to handle Excel if output format changes
 def save_dataframe(df, file_path):
     """
     Saves a pandas DataFrame to the specified file path.
     Includes basic error handling for permissions.
+    Skips the write when the file already holds the same data, detected through a content
+    hash stored next to it in a '<file_path>.hash' sidecar file together with the size and
+    modification time of the file as written, so a file changed since then is rewritten.
     """
+    hash_path = file_path + '.hash'
     try:
+        # Hash the column names and the values (without the index) of the dataframe
+        hasher = hashlib.blake2b()
+        hasher.update(repr(df.columns.tolist()).encode())
+        hasher.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        content_hash = hasher.hexdigest()
+
+        if os.path.exists(file_path) and os.path.exists(hash_path):
+            st = os.stat(file_path)
+            with open(hash_path) as f:
+                if f.read().split() == [content_hash, str(st.st_size), str(st.st_mtime_ns)]:
+                    print(f"Data unchanged, skipping save of: '{file_path}'")
+                    return True
+
+        # Remove the old sidecar first, so a write that fails partway is never taken as up to date
+        if os.path.exists(hash_path):
+            os.remove(hash_path)
+
         # Check file extension to decide save method
         if file_path.lower().endswith('.csv'):
+            # The CSV outputs are user-facing and small, so keep DataFrame.to_csv for them:
+            # PyArrow's writer changes line endings and boolean/float formatting.
+            # Use .parquet for large intermediate files instead.
             df.to_csv(file_path, index=False)
+        elif file_path.lower().endswith('.parquet'):
+            # Ensure pyarrow is installed for Parquet support: pip install pyarrow
+            df.to_parquet(file_path, engine='pyarrow', compression='zstd', index=False)
         elif file_path.lower().endswith(('.xlsx', '.xls')):
             # Ensure openpyxl is installed for Excel support: pip install openpyxl
             with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
                 df.to_excel(writer, index=False)
         else:
-            print(f"Error: Unsupported output file type for {file_path}. Please use .csv or .xlsx.")
+            print(f"Error: Unsupported output file type for {file_path}. Please use .csv, .parquet or .xlsx.")
             return False
         
         print(f"Successfully saved data to: '{file_path}'")
+
+        try:
+            st = os.stat(file_path)
+            with open(hash_path, 'w') as f:
+                f.write(f"{content_hash} {st.st_size} {st.st_mtime_ns}")
+        except OSError:
+            pass # Without the sidecar the file is simply rewritten on the next run
         return True
     except PermissionError:
         print(f"ERROR: Permission denied when saving '{file_path}'.")
@@ -48,6 +94,226 @@ def save_dataframe(df, file_path):
         return False
 
 
+def _station_cache_path(file_path, filename):
+    """
+    Returns the cache file path for a station file, keyed by its name,
+    modification time and size so that any change to the file invalidates it.
+    """
+    st = os.stat(file_path)
+    cache_name = f"{filename}_{st.st_mtime_ns}_{st.st_size}_v{SATELLITE_CACHE_VERSION}.parquet"
+    return os.path.join(SATELLITE_CACHE_DIR, cache_name)
+
+
+# Names written by _station_cache_path, plus the temporary files of unfinished cache writes
+_CACHE_ENTRY_PATTERN = re.compile(r'.+_\d+_\d+_v\d+\.parquet(\.\d+\.tmp)?')
+
+
+def _purge_stale_cache(all_files):
+    """
+    Creates the cache directory if needed and deletes every cached entry that does not
+    belong to the current version of one of the given (path, filename) station files.
+    Only files named like cache entries are ever deleted.
+    """
+    os.makedirs(SATELLITE_CACHE_DIR, exist_ok=True)
+    current = {os.path.basename(_station_cache_path(file_path, filename)) for file_path, filename in all_files}
+    with os.scandir(SATELLITE_CACHE_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name not in current and _CACHE_ENTRY_PATTERN.fullmatch(entry.name):
+                os.remove(entry.path)
+
+
+def _read_excel(file_path, **kwargs):
+    """
+    Reads an Excel file with the native calamine parser when python-calamine is installed
+    (pip install python-calamine), falling back to the much slower openpyxl otherwise.
+    """
+    try:
+        return pd.read_excel(file_path, engine='calamine', **kwargs)
+    except ImportError:
+        return pd.read_excel(file_path, engine='openpyxl', **kwargs)
+
+
+def _read_station_chunks(file_path, required_cols, coerce=False):
+    """
+    Reads a station file (CSV or Excel) in chunks of at most SATELLITE_CHUNK_ROWS rows,
+    yielding DataFrames restricted to the required columns with stripped column names.
+    The header is at row 10, after the 9 rows of the NASA POWER file header.
+    CSV precipitation values are parsed straight to float32, which raises a ValueError on a
+    cell that is not a number (or a blank year); with coerce=True such cells are converted
+    to NaN (or <NA>) instead.
+    """
+    if file_path.lower().endswith('.csv'):
+        reader = None
+        if not coerce: # Only the C parser path below can coerce single cells
+            try:
+                # PyArrow's multi-threaded streaming reader is much faster, but needs exact column names
+                import pyarrow as pa
+                import pyarrow.csv as pa_csv
+                reader = pa_csv.open_csv(
+                    file_path,
+                    # A daily row such as '1981,1,1,0\n' is at least 11 bytes long, so a block
+                    # of this size never holds more than SATELLITE_CHUNK_ROWS rows
+                    read_options=pa_csv.ReadOptions(skip_rows=9, block_size=SATELLITE_CHUNK_ROWS * 11),
+                    convert_options=pa_csv.ConvertOptions(
+                        include_columns=required_cols,
+                        column_types={'YEAR': pa.int32(), 'PRECTOTCORR': pa.float32()},
+                        # null_values replaces pyarrow's default null strings (such as the empty cell),
+                        # so keep those and add the NASA POWER missing-data sentinel
+                        null_values=pa_csv.ConvertOptions().null_values + ['-999', '-999.0'],
+                    ),
+                )
+            except (ImportError, KeyError):
+                # pyarrow is not installed, or the header names need stripping: use the C parser
+                pass
+
+        if reader is not None:
+            for batch in reader:
+                yield batch.to_pandas()
+            return
+
+        header_renames = None
+        for chunk in pd.read_csv(
+            file_path,
+            header=9,
+            usecols=lambda col: col.strip() in required_cols,
+            # In coerce mode YEAR is nullable, so a row with a blank year is dropped by the
+            # yearly groupby instead of failing the whole station file
+            dtype={'YEAR': 'Int32'} if coerce else {'YEAR': 'int32', 'PRECTOTCORR': 'float32'},
+            na_values=['-999', '-999.0', -999], # NASA POWER missing-data sentinel
+            skipinitialspace=True, # Trims leading blanks of the header names and values while parsing
+            engine='c',
+            chunksize=SATELLITE_CHUNK_ROWS,
+        ):
+            # Trailing blanks in the header names are left, so rename those once found on the first chunk
+            if header_renames is None:
+                header_renames = {col: col.strip() for col in chunk.columns if col != col.strip()}
+            if header_renames:
+                chunk = chunk.rename(columns=header_renames)
+            if coerce and 'PRECTOTCORR' in chunk.columns:
+                # Convert precipitation column to numeric, coercing errors to NaN
+                chunk['PRECTOTCORR'] = pd.to_numeric(chunk['PRECTOTCORR'], errors='coerce').astype('float32')
+            yield chunk
+    else: # .xlsx or .xls cannot be streamed, so the sheet is a single chunk
+        df = _read_excel(file_path, header=9, usecols=lambda col: str(col).strip() in required_cols)
+        # openpyxl does not trim the header names, so strip the required ones to ensure exact match
+        df = df.rename(columns={col: str(col).strip() for col in df.columns if str(col).strip() in required_cols})
+        if 'PRECTOTCORR' in df.columns:
+            # Excel cells are not typed by the parser, so convert to numeric, coercing errors to NaN.
+            # read_excel's na_values does not match numeric cells, so the NASA POWER missing-data
+            # sentinel is masked after the conversion instead.
+            precipitation = pd.to_numeric(df['PRECTOTCORR'], errors='coerce')
+            df['PRECTOTCORR'] = precipitation.mask(precipitation == -999)
+        yield df
+
+
+def _sum_yearly_precipitation(chunks, required_cols):
+    """
+    Accumulates the sum and count of the valid PRECTOTCORR values per YEAR chunk by chunk,
+    so only one chunk of daily rows is ever held in memory. Returns None if there were no chunks.
+    Raises a KeyError holding the found column names if a required column is missing.
+    """
+    yearly_totals = None
+    for chunk in chunks:
+        # Ensure required columns exist
+        if not all(col in chunk.columns for col in required_cols):
+            raise KeyError(chunk.columns.tolist())
+
+        # Remove rows where precipitation data is invalid/missing
+        chunk = chunk.dropna(subset=['PRECTOTCORR'])
+
+        # Sum in float64 so precision is not lost when adding up many chunks
+        part = chunk['PRECTOTCORR'].astype(np.float64).groupby(chunk['YEAR']).agg(['sum', 'count'])
+        yearly_totals = part if yearly_totals is None else yearly_totals.add(part, fill_value=0)
+    return yearly_totals
+
+
+def _process_station_file(file_path, filename):
+    """
+    Reads a single station file (CSV or Excel) and returns a tuple of the sum and count of its
+    valid precipitation values per year as a DataFrame (None if the file had to be skipped)
+    and the list of warning messages for the file.
+    Runs inside a worker process, so it must stay at module level and leaves printing
+    the warnings to the main process instead of writing to stdout for every file.
+    """
+    try:
+        # Extract the station number from the filename (e.g., '806' from '806.csv')
+        station_number_str = os.path.splitext(filename)[0].strip() # Strip any whitespace
+        
+        # Ensure station_number is treated as an integer
+        if not station_number_str.isdigit():
+            return None, [f"  - Skipping file with non-numeric name: {filename}"]
+        station_number = int(station_number_str)
+
+        # Reuse the cached result if the station file has not changed since the last run
+        cache_path = _station_cache_path(file_path, filename)
+        if os.path.exists(cache_path):
+            try:
+                station_df = pd.read_parquet(cache_path)
+                logger.debug(f"  - Using cached data for: {filename} for station {station_number}")
+                return station_df, []
+            except Exception as e:
+                # A damaged cache entry must never cost the station, so drop it and re-parse the file
+                logger.debug(f"  - Ignoring unreadable cached data for: {filename}: {e}")
+                try:
+                    os.remove(cache_path)
+                except OSError:
+                    pass
+
+        logger.debug(f"  - Reading file: {filename} for station {station_number}")
+        
+        # Only these columns are used; everything else in the file is skipped at parse time
+        required_cols = ['YEAR', 'PRECTOTCORR']
+
+        try:
+            try:
+                yearly_totals = _sum_yearly_precipitation(_read_station_chunks(file_path, required_cols), required_cols)
+            except ValueError:
+                # A precipitation cell that is not a number fails the fast typed parse, so re-read
+                # the file coercing such cells to NaN; only those rows are dropped, not the station
+                yearly_totals = _sum_yearly_precipitation(
+                    _read_station_chunks(file_path, required_cols, coerce=True), required_cols
+                )
+        except KeyError as e:
+            return None, [f"    - Warning: Skipping {filename}. Missing one of the required columns: {required_cols}. Found: {e.args[0]}"]
+
+        # Check if any data remains after dropping NaNs
+        if yearly_totals is None or yearly_totals['count'].sum() == 0:
+            return None, [f"    - Warning: No valid PRECTOTCORR data found in {filename} after cleaning. Skipping."]
+
+        # Return the per-year totals tagged with the station number.
+        # The yearly average itself is computed once over all stations in calculate_satellite_averages.
+        station_df = yearly_totals.reset_index().assign(**{'Station Number': station_number})
+
+        # Caching is only an optimization, so never fail the file because of it.
+        # Write to a temporary file first so an interrupted write never leaves a partial entry.
+        messages = []
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            station_df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, cache_path)
+        except ImportError:
+            pass # No Parquet engine (pyarrow) installed, so caching is disabled
+        except OSError as e:
+            messages.append(f"    - Warning: Could not cache {filename}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+        return station_df, messages
+
+    except Exception as e:
+        return None, [f"    - Error processing file {file_path}: {e}"]
+
+
+def _configure_logging(level):
+    """
+    Sets up the root logger with the given level. Also runs in every pool worker process,
+    so it must stay at module level.
+    """
+    logging.basicConfig(level=level, format='%(message)s')
+
+
 def calculate_satellite_averages(data_directory):
     """
     Task 1: Reads all station files (CSV and Excel) from the satellite data
@@ -56,78 +322,78 @@ def calculate_satellite_averages(data_directory):
     """
     print("--- Task 1: Processing Satellite Data ---")
     
-    # Find all .csv and .xlsx files in the specified directory
-    search_path_csv = os.path.join(data_directory, '*.csv')
-    search_path_xlsx = os.path.join(data_directory, '*.xlsx')
-    all_files = glob.glob(search_path_csv) + glob.glob(search_path_xlsx)
+    # Find all .csv and .xlsx files in the specified directory with a single directory scan,
+    # keeping (path, filename) pairs sorted so the processing order is deterministic
+    try:
+        with os.scandir(data_directory) as entries:
+            all_files = sorted(
+                (entry.path, entry.name) for entry in entries
+                if entry.is_file() and entry.name.lower().endswith(('.csv', '.xlsx'))
+            )
+    except FileNotFoundError:
+        all_files = []
 
     if not all_files:
         print(f"Error: No CSV or Excel files found in '{data_directory}'. Please check the path.")
         return pd.DataFrame()
 
     print(f"Found {len(all_files)} station files to process.")
+
+    try:
+        _purge_stale_cache(all_files)
+    except OSError as e:
+        print(f"Warning: Could not clean the cache directory '{SATELLITE_CACHE_DIR}': {e}")
     
+    # Each station file is independent, so parse them in parallel across CPU cores
+    # Workers get the logging level of the main process, since under the spawn start method
+    # (the default on Windows) they do not inherit its logging setup
+    with ProcessPoolExecutor(
+        initializer=_configure_logging, initargs=(logging.getLogger().getEffectiveLevel(),)
+    ) as executor:
+        file_paths, filenames = zip(*all_files)
+        results = list(executor.map(_process_station_file, file_paths, filenames, chunksize=4))
+
+    # Report the warnings of all files at once, followed by a compact summary
     all_station_data = []
-
-    for file_path in all_files:
-        try:
-            # Extract the station number from the filename (e.g., '806' from '806.csv')
-            filename = os.path.basename(file_path)
-            station_number_str = os.path.splitext(filename)[0].strip() # Strip any whitespace
-            
-            # Ensure station_number is treated as an integer
-            if not station_number_str.isdigit():
-                print(f"  - Skipping file with non-numeric name: {filename}")
-                continue
-            station_number = int(station_number_str)
-
-            print(f"  - Reading file: {filename} for station {station_number}") # Debug print
-            
-            # Read the file, skipping the first 9 rows to get to the header at row 10
-            if file_path.lower().endswith('.csv'):
-                df = pd.read_csv(file_path, header=9)
-            else: # .xlsx or .xls
-                df = pd.read_excel(file_path, header=9)
-
-            # Ensure required columns exist
-            required_cols = ['YEAR', 'MO', 'DY', 'PRECTOTCORR']
-            # Strip whitespace from column names to ensure exact match
-            df.columns = df.columns.str.strip() 
-            if not all(col in df.columns for col in required_cols):
-                print(f"    - Warning: Skipping {filename}. Missing one of the required columns: {required_cols}. Found: {df.columns.tolist()}")
-                continue
-
-            # Convert precipitation column to numeric, coercing errors to NaN
-            df['PRECTOTCORR'] = pd.to_numeric(df['PRECTOTCORR'], errors='coerce')
-            
-            # Remove rows where precipitation data is invalid/missing
-            df.dropna(subset=['PRECTOTCORR'], inplace=True)
-
-            # Check if any data remains after dropping NaNs
-            if df.empty:
-                print(f"    - Warning: No valid PRECTOTCORR data found in {filename} after cleaning. Skipping.")
-                continue
-
-            # Calculate the yearly average for 'PRECTOTCORR'
-            yearly_avg = df.groupby('YEAR')['PRECTOTCORR'].mean().reset_index()
-            
-            # Rename columns for consistency
-            yearly_avg.rename(columns={'YEAR': 'Year', 'PRECTOTCORR': 'Satellite Average'}, inplace=True)
-            
-            # Add the station number to the dataframe
-            yearly_avg['Station Number'] = station_number
-            
-            all_station_data.append(yearly_avg)
-
-        except Exception as e:
-            print(f"    - Error processing file {file_path}: {e}")
+    for station_df, messages in results:
+        for message in messages:
+            print(message)
+        if station_df is not None:
+            all_station_data.append(station_df)
+    skipped = len(all_files) - len(all_station_data)
+    print(f"{len(all_station_data)}/{len(all_files)} station files parsed, {skipped} skipped.")
 
     if not all_station_data:
         print("No valid satellite data could be processed.")
         return pd.DataFrame()
         
-    # Combine all dataframes into a single one
-    final_df = pd.concat(all_station_data, ignore_index=True)
+    # Combine the per-year totals of all stations into a single dataframe by filling
+    # pre-allocated column arrays, instead of letting pd.concat copy every small frame.
+    # The keys use plain 32-bit integers, the same type the Task 3 merge works on.
+    total_rows = sum(len(station_df) for station_df in all_station_data)
+    stations = np.empty(total_rows, dtype=np.int32)
+    years = np.empty(total_rows, dtype=np.int32)
+    sums = np.empty(total_rows, dtype=np.float64)
+    counts = np.empty(total_rows, dtype=np.int64)
+    offset = 0
+    for station_df in all_station_data:
+        end = offset + len(station_df)
+        stations[offset:end] = station_df['Station Number'].to_numpy()
+        years[offset:end] = station_df['YEAR'].to_numpy()
+        sums[offset:end] = station_df['sum'].to_numpy()
+        counts[offset:end] = station_df['count'].to_numpy()
+        offset = end
+
+    all_rows = pd.DataFrame(
+        {'Station Number': stations, 'YEAR': years, 'sum': sums, 'count': counts}, copy=False
+    )
+
+    # Calculate the yearly average for 'PRECTOTCORR' of every station in a single groupby,
+    # skipping years without a single valid value
+    final_df = all_rows.groupby(['Station Number', 'YEAR'], sort=False, as_index=False)[['sum', 'count']].sum()
+    final_df = final_df[final_df['count'] > 0]
+    final_df = final_df.assign(**{'Satellite Average': final_df['sum'] / final_df['count']})
+    final_df = final_df.rename(columns={'YEAR': 'Year'})
     
     # Reorder columns for clarity
     final_df = final_df[['Station Number', 'Year', 'Satellite Average']]
@@ -149,10 +415,14 @@ def read_observed_data(file_path):
     try:
         # Determine how to read the file based on its extension
         if file_path.lower().endswith('.csv'):
-            df = pd.read_csv(file_path)
+            try:
+                df = pd.read_csv(file_path, engine='pyarrow', dtype_backend='pyarrow')
+            except ImportError:
+                # pyarrow is not installed, fall back to the default C parser
+                df = pd.read_csv(file_path)
             print(f"Successfully read observed data from CSV file: {os.path.basename(file_path)}")
         elif file_path.lower().endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(file_path)
+            df = _read_excel(file_path)
             print(f"Successfully read observed data from Excel file: {os.path.basename(file_path)}")
         else:
             print(f"Error: Unsupported file type for observed data: {file_path}")
@@ -160,19 +430,14 @@ def read_observed_data(file_path):
 
         print(f"  - Found {len(df)} rows in the observed data file.")
 
-        # Function to extract the station number.
+        # Extract the station number from the 'File' column.
         # This regex finds the first number with 3 or more digits, which is more
         # likely to be the station ID than shorter numbers.
-        def extract_station_number(file_name_string):
-            if not isinstance(file_name_string, str):
-                return None
-            # Strip leading/trailing whitespace from the string before regex search
-            cleaned_string = file_name_string.strip() 
-            match = re.search(r'(\d{3,})', cleaned_string) # Look for numbers with 3 or more digits
-            return int(match.group(0)) if match else None
-
-        # Apply the function to create a 'Station Number' column
-        df['Station Number'] = df['File'].apply(extract_station_number)
+        df['Station Number'] = (
+            df['File'].astype(str).str.strip()
+            .str.extract(r'(\d{3,})', expand=False)
+            .astype('Int64')
+        )
         
         valid_stations = df['Station Number'].notna().sum()
         print(f"  - Successfully extracted {valid_stations} station numbers.")
@@ -181,11 +446,18 @@ def read_observed_data(file_path):
         
         # Drop rows where station number couldn't be extracted
         df.dropna(subset=['Station Number'], inplace=True)
-        df['Station Number'] = df['Station Number'].astype(int)
+        df['Station Number'] = df['Station Number'].astype(np.int32)
+
+        # Drop rows without a year, which can neither be matched nor cast to an integer
+        df.dropna(subset=['Year'], inplace=True)
 
         # Select and rename columns to match for merging
         df_observed = df[['Station Number', 'Year', 'Average Data']].copy()
         df_observed.rename(columns={'Average Data': 'Observed Average'}, inplace=True)
+
+        # Station numbers are a small set repeated over many years, so store them as a category
+        # for the Task 4 groupby, which runs on the observed side of the merge
+        df_observed['Station Number'] = df_observed['Station Number'].astype('category')
         
         return df_observed
 
@@ -202,6 +474,9 @@ def main():
     3. Merge data and calculate yearly correction factors.
     4. Calculate grand correction factors.
     """
+    # Per-file debug messages of Task 1 are only shown when the level is lowered to DEBUG
+    _configure_logging(logging.INFO)
+
     print("Starting data processing for correction factors...\n")
 
     # Task 1: Get satellite data averages
@@ -245,14 +520,30 @@ def main():
     # Task 3: Merge data and calculate yearly correction factors
     print("\n--- Task 3: Merging Data and Calculating Correction Factors ---")
     
-    # Ensure 'Station Number' and 'Year' columns are of consistent integer type before merging
-    # Using 'Int64' for nullable integer type to handle potential NaNs gracefully
-    df_observed['Station Number'] = df_observed['Station Number'].astype('Int64')
-    df_observed['Year'] = df_observed['Year'].astype('Int64')
-    df_satellite['Station Number'] = df_satellite['Station Number'].astype('Int64')
-    df_satellite['Year'] = df_satellite['Year'].astype('Int64')
+    # Ensure 'Year' columns are of consistent integer type before merging.
+    # Rows missing a station number or year were already dropped, so plain numpy int32 years are safe here.
+    df_observed['Year'] = df_observed['Year'].astype(np.int32)
+    df_satellite['Year'] = df_satellite['Year'].astype(np.int32)
+
+    # Pack each station-year pair into a single int64 key (station number in the high bits,
+    # year in the low 20 bits), so the join hashes one integer per row instead of two columns
+    for df in (df_observed, df_satellite):
+        df['_key'] = (df['Station Number'].to_numpy(dtype=np.int64) << 20) | df['Year'].to_numpy(dtype=np.int64)
 
-    df_merged = pd.merge(df_observed, df_satellite, on=['Station Number', 'Year'], how='inner')
+    # Pre-sort both sides on the merge key; each station-year must appear at most once per side
+    df_observed.sort_values('_key', inplace=True)
+    df_satellite.sort_values('_key', inplace=True)
+
+    try:
+        df_merged = pd.merge(
+            df_observed, df_satellite[['_key', 'Satellite Average']], on='_key', how='inner',
+            validate='one_to_one', sort=False,
+        )
+    except pd.errors.MergeError as e:
+        print(f"\nERROR: Duplicate station-year rows found in the observed or satellite data: {e}")
+        print("Halting script.")
+        return
+    df_merged.drop(columns='_key', inplace=True)
 
     print(f"Shape of merged_df after inner merge: {df_merged.shape}") # Debug print
 
@@ -263,10 +554,13 @@ def main():
         
     # Calculate the correction factor
     # Use np.nan for division by zero to indicate undefined values
-    df_merged['Correction Factor'] = df_merged.apply(
-        lambda row: row['Observed Average'] / row['Satellite Average'] if row['Satellite Average'] != 0 else np.nan,
-        axis=1
-    )
+    # (vectorized over the whole column instead of a per-row apply)
+    observed = df_merged['Observed Average'].to_numpy(dtype=np.float64)
+    satellite = df_merged['Satellite Average'].to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correction_factor = observed / satellite
+    correction_factor[satellite == 0] = np.nan
+    df_merged['Correction Factor'] = correction_factor
     
     # Save the yearly correction factors
     if not save_dataframe(df_merged, YEARLY_CORRECTION_FACTOR_FILE):
@@ -275,15 +569,19 @@ def main():
     # Task 4: Calculate and save the Grand Correction Factor
     print("\n--- Task 4: Calculating Grand Correction Factor ---")
     
-    # Drop rows where Correction Factor is NaN (e.g., from division by zero) before calculating mean
-    df_grand_factor = df_merged.dropna(subset=['Correction Factor'])
+    # The grouped mean skips NaN Correction Factors (e.g., from division by zero) on its own,
+    # so there is no need to drop them from the merged data first
+    df_grand_factor = (
+        df_merged.groupby('Station Number', sort=False, observed=True)['Correction Factor']
+        .mean()
+        .dropna() # Stations without a single valid yearly factor
+        .rename('Grand Correction Factor')
+        .reset_index()
+    )
 
     if df_grand_factor.empty:
         print("No valid correction factors to calculate Grand Correction Factor after removing NaNs.")
         return
-
-    df_grand_factor = df_grand_factor.groupby('Station Number')['Correction Factor'].mean().reset_index()
-    df_grand_factor.rename(columns={'Correction Factor': 'Grand Correction Factor'}, inplace=True)
     
     # Save the grand correction factors
     if not save_dataframe(df_grand_factor, GRAND_CORRECTION_FACTOR_FILE):
@@ -0,0 +1,147 @@
+import os
+
+import pytest
+
+import cf
+
+
+NASA_POWER_HEADER = """-BEGIN HEADER-
+NASA/POWER Source Native Resolution Daily Data
+Dates (month/day/year): 01/01/1981 through 12/31/1982 in LST
+Location: latitude  29.4973   longitude 80.4974
+elevation from MERRA-2: Average for 0.5 x 0.625 degree lat/lon region = 1805.45 meters
+The value for missing source data that cannot be computed or is outside of the sources availability range: -999
+parameter(s):
+PRECTOTCORR     MERRA-2 Precipitation Corrected (mm/day)
+-END HEADER-
+"""
+
+
+@pytest.fixture
+def station_dir(tmp_path, monkeypatch):
+    """Directory for station files, with the station cache redirected into tmp_path."""
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    monkeypatch.setattr(cf, 'SATELLITE_CACHE_DIR', str(cache_dir))
+    return tmp_path
+
+
+def write_station_file(directory, filename, rows):
+    file_path = os.path.join(directory, filename)
+    with open(file_path, 'w') as f:
+        f.write(NASA_POWER_HEADER)
+        f.write("YEAR,MO,DY,PRECTOTCORR\n")
+        f.writelines(row + "\n" for row in rows)
+    return file_path
+
+
+def yearly_averages(station_df):
+    return dict(zip(station_df['YEAR'], station_df['sum'] / station_df['count']))
+
+
+def test_process_station_file_averages_per_year(station_dir):
+    file_path = write_station_file(station_dir, '806.csv', [
+        "1981,1,1,1.0", "1981,1,2,3.0", "1982,1,1,5.0",
+    ])
+
+    station_df, messages = cf._process_station_file(file_path, '806.csv')
+
+    assert messages == []
+    assert set(station_df['Station Number']) == {806}
+    assert yearly_averages(station_df) == {1981: 2.0, 1982: 5.0}
+
+
+def test_process_station_file_skips_empty_and_sentinel_cells(station_dir):
+    file_path = write_station_file(station_dir, '806.csv', [
+        "1981,1,1,1.0", "1981,1,2,", "1981,1,3,-999", "1981,1,4,3.0",
+    ])
+
+    station_df, messages = cf._process_station_file(file_path, '806.csv')
+
+    assert messages == []
+    assert yearly_averages(station_df) == {1981: 2.0}
+
+
+def test_process_station_file_skips_sentinel_cells_in_excel(station_dir):
+    pytest.importorskip('openpyxl')
+    rows = cf.pd.DataFrame({'YEAR': [1981, 1981, 1981], 'MO': [1, 1, 1], 'DY': [1, 2, 3], 'PRECTOTCORR': [1.0, -999, 3.0]})
+    file_path = os.path.join(station_dir, '807.xlsx')
+    with cf.pd.ExcelWriter(file_path, engine='openpyxl') as writer:
+        rows.to_excel(writer, index=False, startrow=9)
+
+    station_df, messages = cf._process_station_file(file_path, '807.xlsx')
+
+    assert messages == []
+    assert yearly_averages(station_df) == {1981: 2.0}
+
+
+def test_process_station_file_drops_only_non_numeric_cells(station_dir):
+    file_path = write_station_file(station_dir, '806.csv', [
+        "1981,1,1,1.0", "1981,1,2,abc", "1981,1,3,3.0",
+    ])
+
+    station_df, messages = cf._process_station_file(file_path, '806.csv')
+
+    assert messages == []
+    assert yearly_averages(station_df) == {1981: 2.0}
+
+
+def test_process_station_file_drops_only_rows_without_year(station_dir):
+    file_path = write_station_file(station_dir, '806.csv', [
+        "1981,1,1,1.0", ",1,2,5.0", "1981,1,3,3.0",
+    ])
+
+    station_df, messages = cf._process_station_file(file_path, '806.csv')
+
+    assert messages == []
+    assert yearly_averages(station_df) == {1981: 2.0}
+
+
+def test_process_station_file_reports_missing_columns(station_dir):
+    file_path = os.path.join(station_dir, '806.csv')
+    with open(file_path, 'w') as f:
+        f.write(NASA_POWER_HEADER + "YEAR,MO,DY\n1981,1,1\n")
+
+    station_df, messages = cf._process_station_file(file_path, '806.csv')
+
+    assert station_df is None
+    assert "Missing one of the required columns" in messages[0]
+
+
+def test_save_dataframe_skips_unchanged_data_only_while_file_is_untouched(tmp_path, capsys):
+    df = cf.pd.DataFrame({'Station Number': [806], 'Grand Correction Factor': [1.5]})
+    file_path = str(tmp_path / 'grand_correction_factors.csv')
+
+    assert cf.save_dataframe(df, file_path)
+    assert cf.save_dataframe(df, file_path)
+    assert "Data unchanged" in capsys.readouterr().out
+
+    with open(file_path, 'w') as f:
+        f.write("garbage")
+    assert cf.save_dataframe(df, file_path)
+    assert "Data unchanged" not in capsys.readouterr().out
+    assert cf.pd.read_csv(file_path).equals(df)
+
+
+def test_read_observed_data_drops_rows_without_year(tmp_path):
+    file_path = tmp_path / 'all_files_years_and_averages.csv'
+    file_path.write_text(
+        "File,Year,Average Data,Is Leap Year\n"
+        "23 best from 1104 c.xlsx,1981,4.5,False\n"
+        "23 best from 1104 c.xlsx,,4.5,False\n"
+    )
+
+    df_observed = cf.read_observed_data(str(file_path))
+
+    assert df_observed['Year'].astype(cf.np.int32).tolist() == [1981]
+    assert df_observed['Station Number'].tolist() == [1104]
+
+
+@pytest.mark.parametrize('values', [[1.5, 2.0], ['a,b', 'c'], [True, False]])
+def test_save_dataframe_writes_csv_like_to_csv(tmp_path, values):
+    df = cf.pd.DataFrame({'Station Number': [806, 807], 'Value': values})
+    file_path = tmp_path / 'out.csv'
+
+    assert cf.save_dataframe(df, str(file_path))
+
+    assert file_path.read_bytes() == df.to_csv(index=False).encode()